@@ -9,6 +9,8 @@ import random
 from datetime import datetime
 import json
 
+from personality_registry import PersonalityRegistry
+
 # STEP 1: MOCK GPT SYSTEM
 print("🤖 INITIALIZING CHATBOT SYSTEM...")
 
@@ -20,193 +22,66 @@ class MockGPTResponse:
         })()]
 
 class SmartMockGPT:
-    """Intelligent mock GPT that generates contextual responses"""
+    """Intelligent mock GPT that generates contextual responses.
     
-    def __init__(self):
-        self.response_templates = {
-            'technical_expert': {
-                'keywords': ['error', 'bug', 'code', 'api', 'database', 'server'],
-                'templates': [
-                    "Let me help you troubleshoot this issue. First, can you check {suggestion}? This error typically occurs when {explanation}. Here's what I recommend: {solution}",
-                    "This is a common {issue_type} problem. To resolve it: 1) {step1}, 2) {step2}, 3) {step3}. Let me know if you need more details on any step.",
-                    "Based on the symptoms you're describing, this looks like {diagnosis}. The best approach is to {approach}. Would you like me to walk you through the implementation?"
-                ]
-            },
-            'creative_partner': {
-                'keywords': ['story', 'write', 'character', 'plot', 'creative'],
-                'templates': [
-                    "What an intriguing concept! For your {project_type}, consider exploring {creative_angle}. You could develop this by {development_suggestion}. What draws you most to this idea?",
-                    "I love where this is going! Here's a creative approach: {creative_idea}. This could create tension through {conflict_source}. How do you envision {story_element}?",
-                    "That's a fascinating premise! To make it even more compelling, what if {plot_twist}? This would allow you to explore {theme}. Would you like to brainstorm more angles?"
-                ]
-            },
-            'business_advisor': {
-                'keywords': ['revenue', 'strategy', 'market', 'growth', 'roi'],
-                'templates': [
-                    "From a strategic perspective, this requires analyzing {key_metrics}. I recommend focusing on {strategic_focus} because {business_rationale}. What's your current baseline for {measurement}?",
-                    "This is a critical business decision. Let's break it down: Market opportunity: {opportunity}, Risk factors: {risks}, Expected ROI: {roi_estimate}. Have you considered {alternative_approach}?",
-                    "Based on industry best practices, {recommendation}. The key success factors are: {success_factors}. I'd suggest testing this with {validation_method}. What's your timeline for implementation?"
-                ]
-            },
-            'learning_tutor': {
-                'keywords': ['learn', 'explain', 'understand', 'how', 'what'],
-                'templates': [
-                    "Great question! Let me break this down simply: {concept} works by {simple_explanation}. Think of it like {analogy}. Does this help clarify the concept?",
-                    "I'll explain this step-by-step: First, {step1}. Then, {step2}. Finally, {step3}. The key thing to remember is {key_point}. Would you like me to give you a practical example?",
-                    "This is easier to understand if we start with the basics: {foundation}. Building on that, {next_level}. The practical application is {application}. What part would you like me to elaborate on?"
-                ]
-            },
-            'helpful_assistant': {
-                'keywords': ['help', 'question', 'need', 'can you'],
-                'templates': [
-                    "I'd be happy to help you with {topic}! Based on what you've shared, I think {suggestion} would be most helpful. {additional_info}. What would you like to explore first?",
-                    "That's a great question about {subject}. Here's what I can tell you: {information}. {helpful_tip}. Is there a specific aspect you'd like me to focus on?",
-                    "I understand you're looking for help with {area}. Let me provide some guidance: {guidance}. {encouragement}. Feel free to ask if you need clarification on anything!"
-                ]
-            }
-        }
+    Keywords, templates, fillers and fallback responses come from a
+    ``PersonalityRegistry``; by default the bundled ``personalities/`` files.
+    """
+    
+    def __init__(self, registry=None):
+        self.registry = registry or default_registry
         
-        self.fallback_responses = [
-            "That's an interesting point. Could you tell me more about what specifically you'd like to explore?",
-            "I understand what you're asking. Let me think about the best way to approach this...",
-            "Thanks for sharing that with me. What would be most helpful for you right now?",
-            "That's a thoughtful question. Based on what you've mentioned, I think we should consider...",
-            "I see what you mean. There are several ways we could look at this..."
-        ]
+        # Routing decision for the most recent reply, used by offline evaluation
+        self.last_route = None
     
-    def generate_response(self, messages, temperature=0.7):
-        """Generate contextual response based on conversation"""
+    def generate_response(self, messages, temperature=0.7, personality=None):
+        """Generate contextual response based on conversation.
+        
+        ``personality`` names the personality to answer as; without it the
+        personality is looked up from the system prompt.
+        """
         if not messages:
             return MockGPTResponse("Hello! How can I help you today?")
         
+        # Pin one registry generation for the whole request so a concurrent
+        # reload can't mix old and new data
+        snapshot = self.registry.snapshot
+        
         # Get the latest user message and system prompt
         user_message = ""
-        personality = "helpful_assistant"
-        
+        system_prompt = None
         for msg in reversed(messages):
-            if msg['role'] == 'user':
+            if msg['role'] == 'user' and not user_message:
                 user_message = msg['content'].lower()
-                break
-            elif msg['role'] == 'system':
-                # Determine personality from system prompt
-                system_content = msg['content'].lower()
-                if 'technical' in system_content:
-                    personality = 'technical_expert'
-                elif 'creative' in system_content:
-                    personality = 'creative_partner'
-                elif 'business' in system_content:
-                    personality = 'business_advisor'
-                elif 'tutor' in system_content:
-                    personality = 'learning_tutor'
+            elif msg['role'] == 'system' and system_prompt is None:
+                system_prompt = msg['content']
+        
+        if personality not in snapshot.personalities:
+            personality = snapshot.personality_for_prompt(system_prompt)
         
         # Generate response based on personality and context
-        response = self._generate_contextual_response(user_message, personality, temperature)
+        response = self._generate_contextual_response(snapshot, user_message, personality, temperature)
         return MockGPTResponse(response)
     
-    def _generate_contextual_response(self, user_message, personality, temperature):
+    def _generate_contextual_response(self, snapshot, user_message, personality, temperature):
         """Generate response based on personality and user input"""
-        if personality in self.response_templates:
-            template_data = self.response_templates[personality]
-            
-            # Check if user message contains relevant keywords
-            contains_keywords = any(keyword in user_message for keyword in template_data['keywords'])
-            
-            if contains_keywords and random.random() > temperature * 0.3:
-                # Use personality-specific template
-                template = random.choice(template_data['templates'])
-                return self._fill_template(template, user_message, personality)
+        template_data = snapshot.personalities[personality]
         
-        # Use fallback response
-        response = random.choice(self.fallback_responses)
-        return self._add_personality_touch(response, personality)
-    
-    def _fill_template(self, template, user_message, personality):
-        """Fill template with contextual information"""
-        # Extract key concepts from user message
-        words = user_message.split()
-        
-        # Generate contextual fillers based on personality
-        fillers = {
-            'technical_expert': {
-                'suggestion': random.choice(['your logs', 'the configuration', 'your dependencies', 'the API endpoints']),
-                'explanation': random.choice(['there\'s a configuration mismatch', 'the service is unavailable', 'there\'s a rate limit']),
-                'solution': random.choice(['restart the service', 'check your API keys', 'update your dependencies']),
-                'issue_type': random.choice(['connectivity', 'authentication', 'configuration']),
-                'step1': 'verify your setup',
-                'step2': 'check the documentation', 
-                'step3': 'test with a simple example',
-                'diagnosis': random.choice(['a timeout issue', 'an authentication problem', 'a version conflict']),
-                'approach': random.choice(['systematic debugging', 'checking the basics first', 'isolating the problem'])
-            },
-            'creative_partner': {
-                'project_type': random.choice(['story', 'character', 'world', 'narrative']),
-                'creative_angle': random.choice(['unexpected relationships', 'hidden motivations', 'moral dilemmas']),
-                'development_suggestion': random.choice(['adding layers of complexity', 'exploring the emotional core', 'building tension gradually']),
-                'creative_idea': random.choice(['subverting expectations', 'exploring the opposite', 'adding a personal stakes']),
-                'conflict_source': random.choice(['internal struggle', 'competing loyalties', 'impossible choices']),
-                'plot_twist': random.choice(['the antagonist was right', 'the hero has been wrong', 'there\'s a hidden connection']),
-                'theme': random.choice(['redemption', 'identity', 'sacrifice', 'growth']),
-                'story_element': random.choice(['the ending', 'the character arc', 'the world-building'])
-            },
-            'business_advisor': {
-                'key_metrics': random.choice(['ROI', 'customer acquisition cost', 'market penetration', 'revenue growth']),
-                'strategic_focus': random.choice(['customer retention', 'market expansion', 'operational efficiency']),
-                'business_rationale': random.choice(['it reduces risk', 'it maximizes returns', 'it builds competitive advantage']),
-                'measurement': random.choice(['conversion rates', 'customer satisfaction', 'market share']),
-                'opportunity': random.choice(['significant upside potential', 'first-mover advantage', 'market gap']),
-                'risks': random.choice(['execution challenges', 'market competition', 'resource constraints']),
-                'roi_estimate': random.choice(['positive within 6 months', 'break-even in year 1', 'long-term value creation']),
-                'alternative_approach': random.choice(['phased rollout', 'pilot program', 'partnership strategy']),
-                'recommendation': random.choice(['focus on core strengths', 'test and iterate', 'invest in capabilities']),
-                'success_factors': random.choice(['team alignment', 'customer focus', 'execution discipline']),
-                'validation_method': random.choice(['A/B testing', 'customer interviews', 'market research'])
-            },
-            'learning_tutor': {
-                'concept': random.choice(['this topic', 'this principle', 'this idea']),
-                'simple_explanation': random.choice(['following a clear pattern', 'building on basic principles', 'connecting related ideas']),
-                'analogy': random.choice(['building blocks', 'a recipe', 'a map', 'layers of an onion']),
-                'step1': 'understanding the foundation',
-                'step2': 'applying the concept',
-                'step3': 'practicing with examples',
-                'key_point': random.choice(['practice makes perfect', 'understanding the why is crucial', 'start simple and build up']),
-                'foundation': random.choice(['the basic definition', 'why this matters', 'how it connects to what you know']),
-                'next_level': random.choice(['we can explore variations', 'we add complexity', 'we see real applications']),
-                'application': random.choice(['solving real problems', 'making better decisions', 'improving your skills'])
-            },
-            'helpful_assistant': {
-                'topic': random.choice(['this question', 'your situation', 'this challenge']),
-                'suggestion': random.choice(['starting with the basics', 'taking a systematic approach', 'breaking it down into steps']),
-                'additional_info': random.choice(['Here are some key points to consider', 'This is a common situation', 'Many people find this helpful']),
-                'subject': random.choice(['this topic', 'your question', 'this area']),
-                'information': random.choice(['several important aspects to consider', 'some key insights', 'helpful context']),
-                'helpful_tip': random.choice(['Pro tip: start small and build up', 'Remember: consistency is key', 'Keep in mind: practice helps']),
-                'area': random.choice(['this topic', 'your question', 'this challenge']),
-                'guidance': random.choice(['here\'s a practical approach', 'consider these options', 'try this strategy']),
-                'encouragement': random.choice(['You\'re on the right track!', 'This gets easier with practice', 'Don\'t hesitate to ask follow-up questions'])
-            }
-        }
+        # Check if user message contains relevant keywords
+        contains_keywords = template_data.matches(user_message)
         
-        # Fill template with appropriate fillers
-        personality_fillers = fillers.get(personality, {})
+        if contains_keywords and template_data.templates and random.random() > temperature * 0.3:
+            # Use personality-specific template
+            self.last_route = {"personality": personality, "keyword_hit": True, "fallback": False}
+            template = random.choice(template_data.templates)
+            return template.fill(template_data.fillers)
         
-        # Replace placeholders in template
-        for key, value in personality_fillers.items():
-            template = template.replace(f'{{{key}}}', value)
-        
-        return template
-    
-    def _add_personality_touch(self, response, personality):
-        """Add personality-specific touches to generic responses"""
-        touches = {
-            'technical_expert': "Let me help you debug this step by step. ",
-            'creative_partner': "I love exploring creative possibilities! ",
-            'business_advisor': "From a strategic perspective, ",
-            'learning_tutor': "Let me explain this clearly for you. ",
-            'helpful_assistant': "I'm here to help! "
-        }
-        
-        touch = touches.get(personality, "")
-        return touch + response
+        # Use fallback response with a personality-specific touch
+        self.last_route = {"personality": personality, "keyword_hit": contains_keywords, "fallback": True}
+        return template_data.touch + random.choice(snapshot.fallback_responses)
+
+# Built-in personalities, loaded from the bundled personalities/ data files
+default_registry = PersonalityRegistry()
 
 # Initialize the smart mock GPT
 smart_gpt = SmartMockGPT()
@@ -215,9 +90,15 @@ smart_gpt = SmartMockGPT()
 class ProfessionalChatbot:
     """Complete chatbot system with conversation management"""
     
-    def __init__(self, personality="helpful_assistant", temperature=0.7):
+    def __init__(self, personality="helpful_assistant", temperature=0.7, backend=None, registry=None,
+                 max_history=20):
         self.personality = personality
         self.temperature = temperature
+        self.max_history = max_history  # None keeps the full history
+        self.registry = registry or default_registry
+        if backend is None:
+            backend = smart_gpt if registry is None else SmartMockGPT(registry)
+        self.backend = backend
         self.conversation_history = []
         self.user_context = {}
         self.system_prompts = self._load_personalities()
@@ -225,33 +106,14 @@ class ProfessionalChatbot:
     
     def _load_personalities(self):
         """Define different chatbot personalities"""
-        return {
-            "helpful_assistant": """You are a helpful, knowledgeable, and friendly AI assistant. 
-            You provide accurate information, ask clarifying questions when needed, and maintain 
-            a professional yet approachable tone. You're great at explaining complex topics simply.""",
-            
-            "technical_expert": """You are a senior technical support specialist with expertise in 
-            software development, APIs, databases, and troubleshooting. You help users solve problems 
-            step-by-step, explain technical concepts clearly, and always ask follow-up questions to 
-            better understand issues. You're patient, thorough, and detail-oriented.""",
-            
-            "creative_partner": """You are an enthusiastic creative writing coach and brainstorming partner. 
-            You help generate story ideas, develop characters, overcome writer's block, and provide 
-            encouraging feedback. You're imaginative, supportive, and love helping people express their 
-            creativity through words.""",
-            
-            "business_advisor": """You are a senior business consultant with expertise in strategy, 
-            operations, and data-driven decision making. You ask probing questions, consider multiple 
-            perspectives, and provide actionable recommendations with clear reasoning. You focus on ROI, 
-            risk assessment, and practical implementation.""",
-            
-            "learning_tutor": """You are a patient and encouraging tutor who excels at breaking down 
-            complex topics into understandable parts. You use examples, analogies, and step-by-step 
-            explanations. You check for understanding and adapt your teaching style to the learner's needs."""
-        }
+        # Read-only mapping shared by every bot on the same registry generation
+        return self.registry.snapshot.system_prompts
     
     def set_personality(self, personality_name):
         """Change chatbot personality"""
+        # Pick up personalities added by a registry reload
+        self.system_prompts = self._load_personalities()
+        
         if personality_name in self.system_prompts:
             self.personality = personality_name
             self.current_system_prompt = self.system_prompts[personality_name]
@@ -269,15 +131,20 @@ class ProfessionalChatbot:
             "personality": self.personality
         })
         
-        # Keep conversation manageable (last 20 messages)
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
+        # Keep conversation manageable (last 20 messages by default)
+        if self.max_history is not None and len(self.conversation_history) > self.max_history:
+            self.conversation_history = self.conversation_history[-self.max_history:]
     
     def chat(self, user_message):
         """Main chat function with full context awareness"""
         # Add user message to history
         self.add_to_conversation("user", user_message)
         
+        # Use the current registry generation's prompt, so a reload that edits
+        # it reaches live sessions too
+        self.current_system_prompt = self.registry.snapshot.system_prompts.get(
+            self.personality, self.current_system_prompt)
+        
         # Prepare messages for the AI
         messages = [
             {"role": "system", "content": self.current_system_prompt}
@@ -290,8 +157,8 @@ class ProfessionalChatbot:
                 "content": msg["content"]
             })
         
-        # Generate response using our smart mock GPT
-        response = smart_gpt.generate_response(messages, self.temperature)
+        # Generate response using the configured backend (smart mock GPT by default)
+        response = self.backend.generate_response(messages, self.temperature, personality=self.personality)
         ai_response = response.choices[0].message.content
         
         # Add AI response to history
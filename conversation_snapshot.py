@@ -0,0 +1,287 @@
+"""
+CONVERSATION SNAPSHOTS
+Compact, versioned binary format for saving and restoring ProfessionalChatbot state
+
+Snapshot layout (little-endian):
+    header   magic b"CBSN" | version u8 | flags u8 | reserved u16
+    body     length-prefixed records (u32 length + payload), zlib-compressed if FLAG_COMPRESSED
+        record 0      JSON metadata: personality, temperature, max_history, user_context, string table
+                      (user_context must hold JSON values only: str keys, str/int/float/bool/None,
+                      lists and dicts; anything that would not round-trip is rejected)
+        record 1..n   one per history message: timestamp ns i64 | role idx u16 | personality idx u16 | UTF-8 content
+
+Archive layout:
+    header   magic b"CBSA" | version u8 | reserved u8 u16
+    entries  u32 key length + UTF-8 session id | u32 snapshot length + snapshot
+"""
+
+import json
+import mmap
+import struct
+import zlib
+
+import pandas as pd
+
+from chatbot_system import ProfessionalChatbot
+
+SNAPSHOT_MAGIC = b"CBSN"
+ARCHIVE_MAGIC = b"CBSA"
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 0x01
+
+_HEADER = struct.Struct("<4sBBH")
+_LENGTH = struct.Struct("<I")
+_MESSAGE = struct.Struct("<qHH")
+
+
+class SnapshotError(ValueError):
+    """Raised when snapshot bytes are malformed or from an unsupported version"""
+
+
+# STEP 1: ENCODING
+def _pack_record(payload):
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def _check_json_value(value, path="user_context"):
+    """Reject values that JSON would silently change or cannot encode"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise SnapshotError(f"{path} has non-string key {key!r}")
+            _check_json_value(item, f"{path}[{key!r}]")
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            _check_json_value(item, f"{path}[{i}]")
+    elif value is not None and not isinstance(value, (str, int, float, bool)):
+        raise SnapshotError(f"{path} holds a {type(value).__name__}, which is not a JSON value")
+
+
+def dump_snapshot(bot, compress=False):
+    """Serialize a chatbot's personality, temperature, history limit, history and user_context to bytes.
+
+    Raises ``SnapshotError`` if ``user_context`` holds anything but JSON values.
+    """
+    _check_json_value(bot.user_context)
+    strings = []
+    string_index = {}
+
+    def intern(value):
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    message_records = []
+    for msg in bot.conversation_history:
+        header = _MESSAGE.pack(
+            pd.Timestamp(msg["timestamp"]).value,
+            intern(msg["role"]),
+            intern(msg.get("personality", bot.personality)),
+        )
+        message_records.append(_pack_record(header + msg["content"].encode("utf-8")))
+
+    meta = {
+        "personality": bot.personality,
+        "temperature": bot.temperature,
+        "max_history": bot.max_history,
+        "user_context": bot.user_context,
+        "strings": strings,
+    }
+    body = _pack_record(json.dumps(meta, separators=(",", ":")).encode("utf-8"))
+    body += b"".join(message_records)
+
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= FLAG_COMPRESSED
+    return _HEADER.pack(SNAPSHOT_MAGIC, FORMAT_VERSION, flags, 0) + body
+
+
+# STEP 2: DECODING
+def _iter_records(body):
+    offset = 0
+    end = len(body)
+    while offset < end:
+        if offset + _LENGTH.size > end:
+            raise SnapshotError("Truncated record length")
+        (length,) = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        if offset + length > end:
+            raise SnapshotError("Truncated record payload")
+        yield body[offset:offset + length]
+        offset += length
+
+
+def load_snapshot(data, registry=None, backend=None):
+    """Rebuild a ProfessionalChatbot from snapshot bytes (bytes, bytearray or memoryview).
+
+    Sessions created on a custom ``PersonalityRegistry`` or backend must be
+    restored with the same ``registry``/``backend``.
+    """
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise SnapshotError("Snapshot is too short")
+
+    magic, version, flags, _ = _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a conversation snapshot")
+    if version > FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {version}")
+
+    try:
+        body = view[_HEADER.size:]
+        if flags & FLAG_COMPRESSED:
+            body = memoryview(zlib.decompress(body))
+
+        records = _iter_records(body)
+        try:
+            meta = json.loads(bytes(next(records)))
+        except StopIteration:
+            raise SnapshotError("Snapshot has no metadata record") from None
+
+        strings = meta["strings"]
+        bot = ProfessionalChatbot(meta["personality"], temperature=meta["temperature"],
+                                  backend=backend, registry=registry,
+                                  max_history=meta.get("max_history", 20))
+        bot.user_context = meta["user_context"]
+        history = []
+        for record in records:
+            timestamp, role, personality = _MESSAGE.unpack_from(record)
+            history.append({
+                "role": strings[role],
+                "content": str(record[_MESSAGE.size:], "utf-8"),
+                "timestamp": pd.Timestamp(timestamp),
+                "personality": strings[personality],
+            })
+    except SnapshotError:
+        raise
+    except (zlib.error, struct.error, ValueError, KeyError, IndexError, TypeError) as e:
+        # json.JSONDecodeError and UnicodeDecodeError are ValueErrors
+        raise SnapshotError(f"Malformed snapshot: {type(e).__name__}: {e}") from e
+    bot.conversation_history = history
+    return bot
+
+
+# STEP 3: ARCHIVES
+def write_archive(path, bots, compress=True):
+    """Write a ``{session_id: chatbot}`` mapping to a snapshot archive file"""
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(ARCHIVE_MAGIC, FORMAT_VERSION, 0, 0))
+        for session_id, bot in bots.items():
+            f.write(_pack_record(str(session_id).encode("utf-8")))
+            f.write(_pack_record(dump_snapshot(bot, compress=compress)))
+
+
+class SnapshotArchive:
+    """Memory-mapped, read-only view over a snapshot archive.
+
+    Only the record lengths are read when the archive is opened; snapshot
+    bytes are returned as zero-copy memoryviews into the mapping.
+    """
+
+    def __init__(self, path):
+        self._index = {}
+        self._view = self._map = None
+        self._file = open(path, "rb")
+        try:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                raise SnapshotError("Archive is empty") from None
+            self._view = memoryview(self._map)
+
+            if len(self._view) < _HEADER.size:
+                raise SnapshotError("Archive is too short")
+            magic, version, _, _ = _HEADER.unpack_from(self._view)
+            if magic != ARCHIVE_MAGIC:
+                raise SnapshotError("Not a snapshot archive")
+            if version > FORMAT_VERSION:
+                raise SnapshotError(f"Unsupported archive version: {version}")
+
+            # Walk the entries by offset so no slice is exported until it is indexed
+            offset, end = _HEADER.size, len(self._view)
+            while offset < end:
+                key, offset = self._read_entry(offset, end)
+                if offset >= end:
+                    raise SnapshotError("Archive entry has no snapshot")
+                start, offset = self._entry_bounds(offset, end)
+                try:
+                    session_id = key.decode("utf-8")
+                except UnicodeDecodeError as e:
+                    raise SnapshotError(f"Malformed session id: {e}") from None
+                self._index[session_id] = self._view[start:offset]
+        except BaseException:
+            try:
+                self.close()
+            except BufferError:
+                pass
+            raise
+
+    def _entry_bounds(self, offset, end):
+        """Return ``(payload_start, payload_end)`` of the record at ``offset``"""
+        if offset + _LENGTH.size > end:
+            raise SnapshotError("Truncated record length")
+        (length,) = _LENGTH.unpack_from(self._view, offset)
+        start = offset + _LENGTH.size
+        if start + length > end:
+            raise SnapshotError("Truncated record payload")
+        return start, start + length
+
+    def _read_entry(self, offset, end):
+        """Copy out a small record (a session id) and return ``(bytes, next_offset)``"""
+        start, stop = self._entry_bounds(offset, end)
+        return self._map[start:stop], stop
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, session_id):
+        return str(session_id) in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __getitem__(self, session_id):
+        """Raw snapshot bytes for a session as a memoryview.
+
+        Each call returns a new view, so closing the archive while it is still
+        held raises ``BufferError`` instead of invalidating it.
+        """
+        return self._index[str(session_id)][:]
+
+    def load(self, session_id, registry=None, backend=None):
+        """Rebuild the chatbot stored for a session (see ``load_snapshot``)"""
+        return load_snapshot(self[session_id], registry=registry, backend=backend)
+
+    def close(self):
+        """Release the mapping and the file.
+
+        Raises ``BufferError`` if the caller still holds memoryviews returned
+        by the archive (or slices of them); the file is closed regardless and the
+        mapping is freed once those views are released.
+        """
+        try:
+            for snapshot in self._index.values():
+                snapshot.release()
+            self._index = {}
+            if self._view is not None:
+                self._view.release()
+                self._view = None
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    raise BufferError(
+                        "Snapshot archive still has memoryviews in use; release them before closing"
+                    ) from None
+                self._map = None
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,470 @@
+"""
+LLM BACKEND ADAPTERS
+Real API backends that return MockGPTResponse-compatible results, plus a local stub server for offline testing
+"""
+
+import http.client
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from chatbot_system import MockGPTResponse, SmartMockGPT
+
+
+class BackendError(RuntimeError):
+    """Raised when a backend request fails after all retries"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+# STEP 1: CONNECTION POOLING
+class ConnectionPool:
+    """Pool of persistent keep-alive connections to a single host.
+
+    Reusing connections means the TCP and TLS handshakes are paid once per
+    connection instead of once per chat turn. At most ``max_connections``
+    are open at once; further requests wait for one to be returned.
+    """
+
+    def __init__(self, base_url, max_connections=10, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_connections)
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _new_connection(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        """Send a request and return ``(status, body_bytes)``.
+
+        ``timeout`` overrides the pool's socket timeout for this request and
+        also bounds the wait for a free connection.
+        """
+        socket_timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=socket_timeout):
+            raise TimeoutError(f"No free connection to {self.host} within {socket_timeout:.1f}s")
+        try:
+            return self._request(method, path, body, headers, socket_timeout)
+        finally:
+            self._slots.release()
+
+    def _request(self, method, path, body, headers, socket_timeout):
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._new_connection()
+            reused = False
+
+        def send(conn):
+            conn.timeout = socket_timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(socket_timeout)
+            conn.request(method, self.base_path + path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response, response.read()
+
+        try:
+            response, data = send(conn)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # The server closed an idle keep-alive connection; retry once on a fresh one
+            conn = self._new_connection()
+            try:
+                response, data = send(conn)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# STEP 2: BASE BACKEND WITH RETRIES AND HEDGING
+class LLMBackend:
+    """Base class for HTTP chat backends.
+
+    Subclasses implement ``_build_request`` and ``_parse_response``; this class
+    handles pooling, retries with jittered exponential backoff and hedging.
+    """
+
+    default_base_url = None
+    default_model = None
+
+    def __init__(self, api_key, model=None, base_url=None, timeout=30.0,
+                 max_retries=3, backoff_base=0.25, backoff_max=8.0,
+                 hedge_after=None, max_connections=10, max_tokens=1000,
+                 request_deadline=None):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        # Overall budget in seconds for one generate_response call, across all
+        # attempts and backoff sleeps; ``timeout`` only bounds each socket operation
+        self.request_deadline = request_deadline
+        self.max_connections = max_connections
+        self.pool = ConnectionPool(base_url or self.default_base_url,
+                                   max_connections=max_connections, timeout=timeout)
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+
+    def _build_request(self, messages, temperature):
+        """Return ``(path, headers, payload_dict)``"""
+        raise NotImplementedError
+
+    def _parse_response(self, data):
+        """Extract the reply text from a decoded JSON response"""
+        raise NotImplementedError
+
+    def _backoff(self, attempt):
+        # "Full jitter": sleep a random amount up to the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _remaining(self, deadline):
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise BackendError(f"{type(self).__name__} request deadline exceeded")
+        return remaining
+
+    def _send_once(self, messages, temperature, timeout=None):
+        path, headers, payload = self._build_request(messages, temperature)
+        headers = {"Content-Type": "application/json", **headers}
+        status, body = self.pool.request("POST", path, json.dumps(payload).encode("utf-8"),
+                                         headers, timeout=timeout)
+        if status != 200:
+            raise BackendError(f"{type(self).__name__} returned HTTP {status}: {body[:200]!r}", status)
+        try:
+            return self._parse_response(json.loads(body))
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise BackendError(f"{type(self).__name__} returned an unexpected response: {e}") from e
+
+    def _send_with_retries(self, messages, temperature, deadline=None, cancelled=None):
+        """Send with retries until success, a non-retryable error, the deadline or cancellation"""
+        attempt = 0
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise BackendError(f"{type(self).__name__} request cancelled")
+            timeout = self._remaining(deadline)
+            if timeout is not None:
+                timeout = min(timeout, self.pool.timeout)
+            try:
+                return self._send_once(messages, temperature, timeout)
+            except BackendError as e:
+                if e.status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    raise
+            except (OSError, http.client.HTTPException) as e:
+                if attempt >= self.max_retries:
+                    raise BackendError(f"{type(self).__name__} request failed: {e}") from e
+
+            delay = self._backoff(attempt)
+            remaining = self._remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise BackendError(f"{type(self).__name__} request deadline exceeded")
+            if cancelled is not None:
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+    def _send_hedged(self, messages, temperature, deadline):
+        """Fire a second request if the first is slower than ``hedge_after`` seconds.
+
+        The losing request is told to stop, so it gives up at its next retry
+        instead of holding an executor thread through its backoff sleeps.
+        """
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                # Two threads per call at most; the pool caps how many are on the wire
+                self._hedge_executor = ThreadPoolExecutor(max_workers=2 * self.max_connections,
+                                                          thread_name_prefix="llm-hedge")
+        executor = self._hedge_executor
+        cancelled = threading.Event()
+
+        try:
+            pending = {executor.submit(self._send_with_retries, messages, temperature, deadline, cancelled)}
+            done, pending = wait(pending, timeout=self.hedge_after)
+            if not done:
+                pending.add(executor.submit(self._send_with_retries, messages, temperature, deadline, cancelled))
+
+            error = None
+            while pending or done:
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+                if not pending:
+                    break
+                done, pending = wait(pending, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise BackendError(f"{type(self).__name__} request deadline exceeded")
+            raise error
+        finally:
+            cancelled.set()
+
+    def generate_response(self, messages, temperature=0.7, personality=None):
+        """Generate a reply; same interface as ``SmartMockGPT.generate_response``.
+
+        ``personality`` is accepted for compatibility; real models are steered
+        by the system prompt alone.
+        """
+        deadline = None
+        if self.request_deadline is not None:
+            deadline = time.monotonic() + self.request_deadline
+        if self.hedge_after is None:
+            content = self._send_with_retries(messages, temperature, deadline)
+        else:
+            content = self._send_hedged(messages, temperature, deadline)
+        return MockGPTResponse(content)
+
+    def close(self):
+        self.pool.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+
+
+# STEP 3: PROVIDER ADAPTERS
+class OpenAIBackend(LLMBackend):
+    """OpenAI Chat Completions API"""
+
+    default_base_url = "https://api.openai.com/v1"
+    default_model = "gpt-4o-mini"
+
+    def _build_request(self, messages, temperature):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        payload = {
+            "model": self.model,
+            "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+            "temperature": temperature,
+            "max_tokens": self.max_tokens,
+        }
+        return "/chat/completions", headers, payload
+
+    def _parse_response(self, data):
+        return data["choices"][0]["message"]["content"]
+
+
+class GroqBackend(OpenAIBackend):
+    """Groq's OpenAI-compatible API"""
+
+    default_base_url = "https://api.groq.com/openai/v1"
+    default_model = "llama-3.1-8b-instant"
+
+
+class AnthropicBackend(LLMBackend):
+    """Anthropic Messages API"""
+
+    default_base_url = "https://api.anthropic.com/v1"
+    default_model = "claude-3-5-haiku-latest"
+    api_version = "2023-06-01"
+
+    def _build_request(self, messages, temperature):
+        headers = {"x-api-key": self.api_key, "anthropic-version": self.api_version}
+        # The system prompt is a top-level field rather than a message
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        payload = {
+            "model": self.model,
+            "messages": [{"role": m["role"], "content": m["content"]}
+                         for m in messages if m["role"] != "system"],
+            "temperature": min(temperature, 1.0),
+            "max_tokens": self.max_tokens,
+        }
+        if system:
+            payload["system"] = system
+        return "/messages", headers, payload
+
+    def _parse_response(self, data):
+        return "".join(block.get("text", "") for block in data["content"] if block.get("type") == "text")
+
+
+BACKENDS = {
+    "openai": (OpenAIBackend, "OPENAI_API_KEY"),
+    "anthropic": (AnthropicBackend, "ANTHROPIC_API_KEY"),
+    "groq": (GroqBackend, "GROQ_API_KEY"),
+}
+
+
+def backend_from_env(provider, **kwargs):
+    """Create a backend using the API key and settings declared in ``.env.example``"""
+    if provider not in BACKENDS:
+        raise ValueError(f"Unknown provider: {provider}. Available: {list(BACKENDS)}")
+    backend_class, key_name = BACKENDS[provider]
+    api_key = os.environ.get(key_name)
+    if not api_key:
+        raise BackendError(f"{key_name} is not set")
+    kwargs.setdefault("max_tokens", int(os.environ.get("MAX_TOKENS", 1000)))
+    return backend_class(api_key, **kwargs)
+
+
+# STEP 4: LOCAL STUB SERVER
+class StubLLMServer(ThreadingHTTPServer):
+    """Local server emulating the OpenAI and Anthropic chat endpoints.
+
+    Replies come from ``SmartMockGPT``. Latency is drawn from a log-normal
+    distribution (``latency_median`` seconds, ``latency_sigma`` spread) and
+    ``error_rate`` of requests fail with one of ``error_statuses``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_median=0.05, latency_sigma=0.5,
+                 error_rate=0.0, error_statuses=(429, 500, 503), seed=None):
+        super().__init__((host, port), _StubHandler)
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.rng = random.Random(seed)
+        self.mock_gpt = SmartMockGPT()
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_outcome(self):
+        """Return ``(delay_seconds, error_status_or_None)`` for the next request"""
+        with self._lock:
+            self.request_count += 1
+            delay = self.rng.lognormvariate(0, self.latency_sigma) * self.latency_median
+            status = self.rng.choice(self.error_statuses) if self.rng.random() < self.error_rate else None
+        return delay, status
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their deadline hang up mid-response; that's expected
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooling can be exercised
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        delay, error_status = self.server.next_outcome()
+        time.sleep(delay)
+        if error_status is not None:
+            self._send_json(error_status, {"error": {"message": "Simulated failure"}})
+            return
+
+        messages = list(request.get("messages", []))
+        if request.get("system"):
+            messages.insert(0, {"role": "system", "content": request["system"]})
+        content = self.server.mock_gpt.generate_response(
+            messages, request.get("temperature", 0.7)
+        ).choices[0].message.content
+
+        if self.path.endswith("/chat/completions"):
+            self._send_json(200, {
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+            })
+        elif self.path.endswith("/messages"):
+            self._send_json(200, {
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model"),
+                "content": [{"type": "text", "text": content}],
+                "stop_reason": "end_turn",
+            })
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+
+# MAIN EXECUTION
+if __name__ == "__main__":
+    from chatbot_system import ProfessionalChatbot
+
+    print("🚀 TESTING LLM BACKENDS AGAINST THE LOCAL STUB SERVER")
+    print("=" * 60)
+
+    with StubLLMServer(error_rate=0.2, seed=42) as server:
+        for backend_class in (OpenAIBackend, AnthropicBackend):
+            backend = backend_class("stub-key", base_url=server.base_url,
+                                    backoff_base=0.01, hedge_after=0.15,
+                                    request_deadline=5.0)
+            bot = ProfessionalChatbot("technical_expert", backend=backend)
+            start = time.perf_counter()
+            for _ in range(20):
+                bot.chat("My API keeps returning 500 errors. Any ideas?")
+            elapsed = time.perf_counter() - start
+            print(f"✅ {backend_class.__name__}: 20 turns in {elapsed:.2f}s")
+            print(f"🤖 Last reply: {bot.conversation_history[-1]['content'][:80]}...")
+            backend.close()
+        print(f"📊 Stub server handled {server.request_count} requests")
@@ -0,0 +1,149 @@
+"""
+MEMORY BUDGET CHECKS
+Measures memory retained per ProfessionalChatbot session and per message with tracemalloc,
+enforces budgets and detects leaks across long runs
+
+Usage:
+    python memory_budget.py                 # report + budget check (exit code 1 on failure)
+    python memory_budget.py --turns 1000000 # long leak soak
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import pandas as pd
+
+from chatbot_system import ProfessionalChatbot
+
+# Retained-bytes budgets; a measurement above its budget fails the run
+MEMORY_BUDGETS = {
+    "empty_session": 2_000,
+    "full_session": 16_000,
+    "per_message": 800,
+    "per_timestamp": 200,
+    "user_context_entry": 300,
+    "leak_per_1k_turns": 512,
+}
+
+SAMPLE_MESSAGE = "My API keeps returning 500 errors randomly. What could be causing this?"
+PERSONALITY_CYCLE = ["technical_expert", "creative_partner", "business_advisor",
+                     "learning_tutor", "helpful_assistant"]
+
+
+# STEP 1: MEASUREMENT HELPERS
+def _traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure_retained(build, count):
+    """Average bytes still allocated per object after calling ``build`` ``count`` times"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = _traced_bytes()
+        kept = [build(i) for i in range(count)]
+        after = _traced_bytes()
+        del kept
+        return (after - before) / count
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _filled_bot(i, messages=20):
+    bot = ProfessionalChatbot(PERSONALITY_CYCLE[i % len(PERSONALITY_CYCLE)])
+    for turn in range(messages):
+        bot.add_to_conversation("user" if turn % 2 == 0 else "assistant", f"{SAMPLE_MESSAGE} #{turn}")
+    return bot
+
+
+def _bot_with_context(i, entries=10):
+    bot = ProfessionalChatbot()
+    for n in range(entries):
+        bot.user_context[f"key_{n}"] = f"value {i}-{n}"
+    return bot
+
+
+# STEP 2: MEASUREMENTS
+def measure_sessions(samples=500):
+    """Retained bytes per session, per message and for the parts of a history entry"""
+    empty = measure_retained(lambda i: ProfessionalChatbot(), samples)
+    full = measure_retained(_filled_bot, samples)
+    context = measure_retained(_bot_with_context, samples)
+    return {
+        "empty_session": empty,
+        "full_session": full,
+        # Bots keep at most 20 history entries
+        "per_message": (full - empty) / 20,
+        "per_timestamp": measure_retained(lambda i: pd.Timestamp.now(), samples * 20),
+        "user_context_entry": (context - empty) / 10,
+    }
+
+
+def measure_leak(turns=100_000, clear_every=50, switch_every=17, warmup=5_000):
+    """Bytes retained per 1000 turns once a session has reached steady state.
+
+    The session chats continuously, clearing its history and switching
+    personality periodically; after warm-up its footprint should stay flat.
+    """
+    bot = ProfessionalChatbot()
+
+    def run(n, offset):
+        for turn in range(offset, offset + n):
+            bot.chat(SAMPLE_MESSAGE)
+            if turn % switch_every == 0:
+                bot.set_personality(PERSONALITY_CYCLE[turn % len(PERSONALITY_CYCLE)])
+            if turn % clear_every == 0:
+                bot.clear_conversation()
+
+    run(warmup, 0)
+    tracemalloc.start()
+    try:
+        # Warm up again under tracing so caches and free lists settle
+        run(warmup, warmup)
+        before = _traced_bytes()
+        run(turns, 2 * warmup)
+        after = _traced_bytes()
+    finally:
+        tracemalloc.stop()
+    return max(0, after - before) * 1000 / turns
+
+
+def check_budgets(results, budgets=MEMORY_BUDGETS):
+    """Return ``(name, measured, budget)`` for every measurement over its budget"""
+    return [(name, value, budgets[name]) for name, value in results.items()
+            if name in budgets and value > budgets[name]]
+
+
+# MAIN EXECUTION
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-session memory and enforce budgets")
+    parser.add_argument("--samples", type=int, default=500, help="Sessions built per measurement")
+    parser.add_argument("--turns", type=int, default=100_000, help="Turns for the leak check")
+    args = parser.parse_args(argv)
+
+    print("🚀 MEASURING SESSION MEMORY")
+    print("=" * 60)
+    results = measure_sessions(args.samples)
+    results["leak_per_1k_turns"] = measure_leak(args.turns)
+
+    for name, value in results.items():
+        print(f"   • {name}: {value:,.0f} bytes (budget {MEMORY_BUDGETS[name]:,})")
+
+    failures = check_budgets(results)
+    if failures:
+        print("\n❌ BUDGETS EXCEEDED:")
+        for name, value, budget in failures:
+            print(f"   • {name}: {value:,.0f} > {budget:,} bytes")
+        return 1
+
+    print("\n✅ All memory budgets met")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+PERSONALITY REGISTRY
+Loads personalities, keywords, templates and fillers from data files and hot-swaps them at runtime.
+The built-in personalities used by ``chatbot_system`` are the bundled files in ``personalities/``.
+
+Each ``<name>.json`` (or ``.yaml``/``.yml`` when PyYAML is installed) in the
+registry directory defines one personality:
+
+    {"version": 1, "name": "...", "system_prompt": "...", "keywords": [...],
+     "templates": ["... {placeholder} ..."], "fillers": {"placeholder": [...]}, "touch": "..."}
+
+``_defaults.json`` holds the shared ``fallback_responses`` and ``default_personality``.
+"""
+
+import json
+import os
+import random
+import string
+import sys
+import threading
+from types import MappingProxyType
+
+try:
+    import yaml
+except ImportError:  # YAML files are optional
+    yaml = None
+
+SCHEMA_VERSION = 1
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "personalities")
+DEFAULTS_FILE = "_defaults"
+
+
+class RegistryError(ValueError):
+    """Raised when a personality file is missing fields or fails validation"""
+
+
+# STEP 1: COMPILED DATA
+class CompiledTemplate:
+    """Template pre-split into literal text and placeholder names"""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def fill(self, fillers, rng=random):
+        return "".join(
+            literal + (rng.choice(fillers[field]) if field else "")
+            for literal, field in self.parts
+        )
+
+
+class Personality:
+    """Validated, immutable personality definition"""
+
+    __slots__ = ("name", "version", "system_prompt", "keywords", "templates", "fillers", "touch")
+
+    def __init__(self, name, version, system_prompt, keywords, templates, fillers, touch):
+        self.name = name
+        self.version = version
+        self.system_prompt = system_prompt
+        self.keywords = keywords
+        self.templates = templates
+        self.fillers = fillers
+        self.touch = touch
+
+    def matches(self, user_message):
+        return any(keyword in user_message for keyword in self.keywords)
+
+
+class _Interner:
+    """Deduplicates strings and filler lists shared by many personalities.
+
+    Tenant-specific personalities are usually small variations on a few base
+    ones, so most of their keywords and filler choices are identical.
+    """
+
+    def __init__(self):
+        self._tuples = {}
+
+    def text(self, value):
+        return sys.intern(value)
+
+    def strings(self, values):
+        values = tuple(sys.intern(v) for v in values)
+        return self._tuples.setdefault(values, values)
+
+
+def _compile_template(template, fillers, source):
+    parts = []
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise RegistryError(f"{source}: invalid template {template!r}: {e}") from None
+
+    for literal, field, format_spec, conversion in parsed:
+        if field is not None and (format_spec or conversion):
+            raise RegistryError(f"{source}: placeholder {{{field}}} must not use format specs")
+        if field is not None and field not in fillers:
+            raise RegistryError(f"{source}: template uses {{{field}}} but no filler is defined for it")
+        parts.append((literal, field))
+    return CompiledTemplate(tuple(parts))
+
+
+def _check_type(value, expected, source, field):
+    if not isinstance(value, expected):
+        names = " or ".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+        raise RegistryError(f"{source}: '{field}' must be {names}, not {type(value).__name__}")
+    return value
+
+
+def _check_strings(values, source, field):
+    _check_type(values, list, source, field)
+    for value in values:
+        _check_type(value, str, source, f"{field}[]")
+    return values
+
+
+def _compile_personality(data, source, interner):
+    _check_type(data, dict, source, "top level")
+    for field in ("name", "system_prompt", "templates"):
+        if field not in data:
+            raise RegistryError(f"{source}: missing required field '{field}'")
+    version = _check_type(data.get("version", SCHEMA_VERSION), int, source, "version")
+    if version > SCHEMA_VERSION:
+        raise RegistryError(f"{source}: unsupported schema version {version}")
+    _check_type(data["name"], str, source, "name")
+    _check_type(data["system_prompt"], str, source, "system_prompt")
+    _check_type(data.get("touch", ""), str, source, "touch")
+    _check_strings(data["templates"], source, "templates")
+    _check_strings(data.get("keywords", []), source, "keywords")
+
+    fillers = {}
+    for key, choices in _check_type(data.get("fillers", {}), dict, source, "fillers").items():
+        if isinstance(choices, str):
+            choices = [choices]
+        _check_strings(choices, source, f"fillers.{key}")
+        if not choices:
+            raise RegistryError(f"{source}: filler '{key}' has no choices")
+        fillers[interner.text(key)] = interner.strings(choices)
+
+    templates = tuple(_compile_template(t, fillers, source) for t in data["templates"])
+    return Personality(
+        name=interner.text(data["name"]),
+        version=version,
+        system_prompt=interner.text(data["system_prompt"]),
+        keywords=interner.strings(k.lower() for k in data.get("keywords", [])),
+        templates=templates,
+        fillers=MappingProxyType(fillers),
+        touch=interner.text(data.get("touch", "")),
+    )
+
+
+class RegistrySnapshot:
+    """One consistent, read-only generation of the registry"""
+
+    def __init__(self, generation, personalities, fallback_responses, default_personality):
+        self.generation = generation
+        self.personalities = MappingProxyType(personalities)
+        self.fallback_responses = fallback_responses
+        self.default_personality = default_personality
+        self.system_prompts = MappingProxyType({p.name: p.system_prompt for p in personalities.values()})
+        self._by_prompt = {p.system_prompt: p.name for p in personalities.values()}
+
+    def personality_for_prompt(self, system_prompt):
+        return self._by_prompt.get(system_prompt, self.default_personality)
+
+
+# STEP 2: LOADING AND HOT RELOAD
+def _load_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                return yaml.safe_load(f)
+            return json.load(f)
+    except ValueError as e:  # JSONDecodeError, UnicodeDecodeError
+        raise RegistryError(f"{path}: {e}") from None
+    except Exception as e:
+        if yaml is not None and isinstance(e, yaml.YAMLError):
+            raise RegistryError(f"{path}: {e}") from None
+        raise
+
+
+class PersonalityRegistry:
+    """Registry of personalities backed by a directory of data files.
+
+    ``reload()`` builds and validates a complete new snapshot before
+    publishing it with a single reference assignment, so callers that already
+    hold a snapshot keep a consistent view and a bad file never replaces a
+    good generation.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self._snapshot = None
+        self._mtimes = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.reload(force=True)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _data_files(self):
+        extensions = (".json", ".yaml", ".yml") if yaml is not None else (".json",)
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(extensions)
+        )
+
+    def _scan_mtimes(self):
+        return {path: os.stat(path).st_mtime_ns for path in self._data_files()}
+
+    def reload(self, force=False):
+        """Reload if any data file changed; returns True when a new snapshot was published"""
+        with self._reload_lock:
+            mtimes = self._scan_mtimes()
+            if not force and mtimes == self._mtimes:
+                return False
+
+            interner = _Interner()
+            personalities = {}
+            defaults = {}
+            for path in mtimes:
+                data = _load_file(path)
+                if os.path.splitext(os.path.basename(path))[0] == DEFAULTS_FILE:
+                    defaults = _check_type(data, dict, path, "top level")
+                    continue
+                personality = _compile_personality(data, path, interner)
+                if personality.name in personalities:
+                    raise RegistryError(f"{path}: duplicate personality '{personality.name}'")
+                personalities[personality.name] = personality
+
+            if not personalities:
+                raise RegistryError(f"No personalities found in {self.directory}")
+            default_personality = defaults.get("default_personality", next(iter(personalities)))
+            fallback_responses = _check_strings(
+                defaults.get("fallback_responses", ["Could you tell me more?"]),
+                DEFAULTS_FILE, "fallback_responses",
+            )
+            if not fallback_responses:
+                raise RegistryError(f"{DEFAULTS_FILE}: 'fallback_responses' must not be empty")
+            if not isinstance(default_personality, str) or default_personality not in personalities:
+                raise RegistryError(f"Default personality '{default_personality}' is not defined")
+
+            generation = self._snapshot.generation + 1 if self._snapshot else 1
+            self._snapshot = RegistrySnapshot(
+                generation,
+                personalities,
+                interner.strings(fallback_responses),
+                default_personality,
+            )
+            self._mtimes = mtimes
+            return True
+
+    def __reduce__(self):
+        # Locks and the watcher thread can't be pickled; a copy sent to a
+        # spawned process reloads from the same directory
+        return type(self), (self.directory,)
+
+    def start_watching(self, interval=2.0):
+        """Poll the directory in a background thread and reload on change"""
+        def watch():
+            failed_mtimes = None
+            while not self._stop_watching.wait(interval):
+                try:
+                    # Report a broken set of files once, not on every poll
+                    if failed_mtimes is not None and self._scan_mtimes() == failed_mtimes:
+                        continue
+                    self.reload()
+                    failed_mtimes = None
+                except Exception as e:
+                    # Keep serving the last good snapshot and keep watching
+                    print(f"⚠️ Personality reload failed: {e}")
+                    try:
+                        failed_mtimes = self._scan_mtimes()
+                    except OSError:
+                        failed_mtimes = None
+
+        if self._watcher is None:
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=watch, daemon=True, name="personality-watcher")
+            self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+# MAIN EXECUTION
+if __name__ == "__main__":
+    from chatbot_system import ProfessionalChatbot
+
+    print("🚀 LOADING PERSONALITY REGISTRY")
+    print("=" * 60)
+
+    registry = PersonalityRegistry()
+    snapshot = registry.snapshot
+    print(f"✅ Generation {snapshot.generation}: {len(snapshot.personalities)} personalities")
+    for name, personality in snapshot.personalities.items():
+        print(f"• {name}: {len(personality.keywords)} keywords, {len(personality.templates)} templates")
+
+    bot = ProfessionalChatbot("technical_expert", temperature=0.3, registry=registry)
+    print(f"\n👤 User: My API keeps returning 500 errors.")
+    print(f"🤖 Bot: {bot.chat('My API keeps returning 500 errors.')}")
@@ -0,0 +1,310 @@
+"""
+OFFLINE REPLAY & EVALUATION PIPELINE
+Streams a JSONL corpus through ProfessionalChatbot in parallel and reports routing statistics
+
+Usage:
+    python replay_pipeline.py corpus.jsonl --output results.jsonl --workers 4 --seed 42
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from chatbot_system import ProfessionalChatbot, smart_gpt
+
+PERSONALITIES = list(ProfessionalChatbot().system_prompts)
+
+
+# STEP 1: CORPUS READING
+def _record_turns(record):
+    """Extract the list of user turns from a corpus record"""
+    for key in ("messages", "conversation", "turns"):
+        if key in record:
+            turns = record[key]
+            turns = [t["content"] if isinstance(t, dict) else t for t in turns
+                     if not isinstance(t, dict) or t.get("role", "user") == "user"]
+            if not turns:
+                raise ValueError(f"Record has no user turns in '{key}'")
+            return turns
+    for key in ("prompt", "message", "body", "text"):
+        if key in record:
+            return [record[key]]
+    raise ValueError(f"Record has no prompt or conversation: {sorted(record)}")
+
+
+def iter_corpus(path):
+    """Lazily yield ``(record_id, turns, personality, error)`` from a JSONL corpus.
+
+    Records that cannot be parsed or have no user turns are yielded with
+    ``turns=None`` and an error message instead of aborting the run.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record_id, personality = str(line_number), None
+            try:
+                record = json.loads(line)
+                record_id = str(record.get("request_id") or record.get("id") or line_number)
+                if not isinstance(record.get("personality", ""), str):
+                    raise TypeError("'personality' must be a string")
+                personality = record.get("personality")
+                yield record_id, _record_turns(record), personality, None
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                yield record_id, None, personality, f"{type(e).__name__}: {e}"
+
+
+def task_seed(base_seed, record_id, personality):
+    """Seed derived from the task itself, so results don't depend on scheduling"""
+    key = f"{base_seed}:{record_id}:{personality}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+# STEP 2: REPLAY
+def _task_fields(record_id, personality, base_seed, temperature):
+    # Identifies a task; results from runs with other parameters are separate tasks
+    return {
+        "record_id": record_id,
+        "personality": personality,
+        "base_seed": base_seed,
+        "temperature": temperature,
+    }
+
+
+def error_row(record_id, personality, base_seed, temperature, error):
+    """Result row recording a task that could not be replayed"""
+    return {**_task_fields(record_id, personality, base_seed, temperature), "error": error}
+
+
+def replay_conversation(record_id, turns, personality, base_seed, temperature=0.7):
+    """Run one conversation through a fresh chatbot and return per-turn rows"""
+    seed = task_seed(base_seed, record_id, personality)
+    random.seed(seed)
+    bot = ProfessionalChatbot(personality, temperature=temperature)
+    rows = []
+    for turn, message in enumerate(turns):
+        start = time.perf_counter()
+        response = bot.chat(message)
+        latency_ms = (time.perf_counter() - start) * 1000
+        route = smart_gpt.last_route or {}
+        rows.append({
+            **_task_fields(record_id, personality, base_seed, temperature),
+            "turn": turn,
+            "turns_total": len(turns),
+            "seed": seed,
+            "prompt": message,
+            "response": response,
+            "latency_ms": round(latency_ms, 3),
+            "prompt_chars": len(message),
+            "response_chars": len(response),
+            "routed_personality": route.get("personality"),
+            "keyword_hit": route.get("keyword_hit"),
+            "fallback": route.get("fallback"),
+        })
+    return rows
+
+
+def iter_results(output_path):
+    """Yield result rows, skipping lines torn by an interrupted write"""
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _task_key(row):
+    return (row["record_id"], row["personality"], row.get("base_seed"), row.get("temperature"))
+
+
+def load_completed(output_path):
+    """Keys of tasks already written to the output, so an interrupted run can resume.
+
+    A task is identified by record, personality, seed and temperature, so a
+    rerun with different parameters does not skip anything. Error rows are
+    not counted, so failed tasks are retried.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    seen_turns = {}
+    for row in iter_results(output_path):
+        if row.get("error") is not None:
+            continue
+        seen_turns.setdefault(_task_key(row), [0, row["turns_total"]])[0] += 1
+    return {key for key, (seen, total) in seen_turns.items() if seen >= total}
+
+
+def run_replay(corpus_path, output_path, personalities=None, workers=None,
+               seed=0, temperature=0.7, max_pending=None):
+    """Replay a corpus and append results to ``output_path``.
+
+    Each (record, personality) task's rows are written and flushed together,
+    so a rerun with the same seed and temperature skips every task already
+    present in the output. A task that fails is written as a single row
+    with an ``error`` field instead of aborting the run.
+    """
+    personalities = personalities or PERSONALITIES
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    completed = load_completed(output_path)
+
+    written = skipped = failed = 0
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        # Terminate a torn line left by an interrupted run before appending
+        if out.tell() > 0:
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    out.write("\n")
+
+        pending = {}
+
+        def write_rows(rows):
+            out.write("".join(json.dumps(row) + "\n" for row in rows))
+            out.flush()
+
+        def write_error(record_id, personality, error):
+            nonlocal failed
+            write_rows([error_row(record_id, personality, seed, temperature, error)])
+            failed += 1
+
+        def drain(return_when):
+            nonlocal written
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                record_id, personality = pending.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    write_error(record_id, personality, f"{type(e).__name__}: {e}")
+                    continue
+                write_rows(rows)
+                written += 1
+
+        for record_id, turns, record_personality, error in iter_corpus(corpus_path):
+            if error is not None:
+                write_error(record_id, record_personality, error)
+                continue
+            for personality in ([record_personality] if record_personality else personalities):
+                if (record_id, personality, seed, temperature) in completed:
+                    skipped += 1
+                    continue
+                if personality not in PERSONALITIES:
+                    write_error(record_id, personality, f"Unknown personality: {personality!r}")
+                    continue
+                # Bound in-flight work so large corpora stream in constant memory
+                if len(pending) >= max_pending:
+                    drain(FIRST_COMPLETED)
+                future = executor.submit(replay_conversation, record_id, turns, personality,
+                                         seed, temperature)
+                pending[future] = (record_id, personality)
+        if pending:
+            drain(ALL_COMPLETED)
+
+    return {"written": written, "skipped": skipped, "failed": failed}
+
+
+# STEP 3: ROUTING STATISTICS
+UNPARSED_PERSONALITY = "(unparsed)"
+
+
+def _count_failed_tasks(results, has_error):
+    """Failed tasks per personality, counting each task once and only while it has no success.
+
+    Resumed runs retry failed tasks and append a new error row each time, so
+    raw error rows overcount.
+    """
+    key = ["record_id", "personality", "base_seed", "temperature"]
+    failed = results.loc[has_error, key].drop_duplicates()
+    succeeded = results.loc[~has_error, key].drop_duplicates()
+    failed = failed.merge(succeeded, on=key, how="left", indicator=True)
+    failed = failed[failed["_merge"] == "left_only"]
+    return failed["personality"].fillna(UNPARSED_PERSONALITY).value_counts().rename("errors")
+
+
+def compute_routing_stats(output_path, seed=None, temperature=None):
+    """Aggregate per-personality routing statistics from replay results.
+
+    Pass ``seed``/``temperature`` to restrict the statistics to one run's
+    parameters when the output holds several.
+    """
+    results = pd.DataFrame.from_records(iter_results(output_path))
+    if results.empty:
+        return pd.DataFrame()
+    if seed is not None:
+        results = results[results["base_seed"] == seed]
+    if temperature is not None:
+        results = results[results["temperature"] == temperature]
+
+    if "error" in results:
+        has_error = results["error"].notna()
+    else:
+        has_error = pd.Series(False, index=results.index)
+    errors = _count_failed_tasks(results, has_error)
+    results = results[~has_error]
+    if results.empty:
+        return pd.DataFrame({"errors": errors})
+
+    results = results.assign(
+        keyword_hit=results["keyword_hit"].astype(bool),
+        fallback=results["fallback"].astype(bool),
+        misrouted=results["routed_personality"] != results["personality"],
+    )
+    grouped = results.groupby("personality")
+    stats = grouped.agg(
+        turns=("turn", "size"),
+        conversations=("record_id", "nunique"),
+        keyword_hit_rate=("keyword_hit", "mean"),
+        fallback_rate=("fallback", "mean"),
+        misrouted_rate=("misrouted", "mean"),
+        avg_response_chars=("response_chars", "mean"),
+        p50_latency_ms=("latency_ms", "median"),
+    )
+    stats["p99_latency_ms"] = grouped["latency_ms"].quantile(0.99)
+    # Unknown and unparsed personalities get rows of their own
+    stats = stats.reindex(stats.index.union(errors.index))
+    stats[["turns", "conversations"]] = stats[["turns", "conversations"]].fillna(0).astype(int)
+    stats["errors"] = errors.reindex(stats.index, fill_value=0)
+    return stats.round(4)
+
+
+# MAIN EXECUTION
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a JSONL corpus through the chatbot personalities")
+    parser.add_argument("corpus", help="JSONL file of prompts or conversations")
+    parser.add_argument("--output", default="replay_results.jsonl", help="Per-turn results (JSONL, appended)")
+    parser.add_argument("--stats", default=None, help="Optional CSV path for routing statistics")
+    parser.add_argument("--personalities", nargs="+", choices=PERSONALITIES, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    args = parser.parse_args(argv)
+
+    print("🚀 STARTING OFFLINE REPLAY")
+    print("=" * 60)
+    start = time.perf_counter()
+    summary = run_replay(args.corpus, args.output, args.personalities,
+                         args.workers, args.seed, args.temperature)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Replayed {summary['written']} conversations in {elapsed:.2f}s "
+          f"({summary['skipped']} already done, {summary['failed']} failed)")
+
+    stats = compute_routing_stats(args.output, args.seed, args.temperature)
+    print("\n📊 ROUTING STATISTICS:")
+    print(stats.to_string())
+    if args.stats:
+        stats.to_csv(args.stats)
+        print(f"\n💾 Saved statistics to {args.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+SHARDED CHATBOT RUNTIME
+Partitions chat sessions across worker processes so throughput scales with cores
+
+Personality prompts and response templates are module-level, read-only data in
+``chatbot_system``. With the ``fork`` start method (the Linux default) workers
+share the parent's copy of those pages; under ``spawn``/``forkserver`` (the
+macOS and Windows defaults) every worker imports its own copy.
+"""
+
+import hashlib
+import multiprocessing as mp
+import os
+import random
+import threading
+from contextlib import contextmanager
+
+from chatbot_system import ProfessionalChatbot, default_registry
+from conversation_snapshot import dump_snapshot, load_snapshot
+
+
+# STEP 1: SESSION ROUTING
+def shard_for_session(session_id, num_shards):
+    """Pick the owning shard for a session using rendezvous (highest-random-weight) hashing.
+
+    Unlike ``hash(session_id) % num_shards`` this is stable across processes and
+    only moves ~1/n of the sessions when a shard is added or removed.
+    """
+    key = str(session_id).encode("utf-8")
+    best_shard, best_weight = 0, b""
+    for shard in range(num_shards):
+        weight = hashlib.blake2b(key, digest_size=8, salt=shard.to_bytes(8, "little")).digest()
+        if weight > best_weight:
+            best_shard, best_weight = shard, weight
+    return best_shard
+
+
+# STEP 2: WORKER PROCESS
+def _worker_loop(conn, shard_id, registry=None):
+    """Serve requests for the sessions owned by one shard until told to stop"""
+    # Forked workers inherit the parent's RNG state; reseed so shards don't
+    # all produce the same "random" template choices.
+    random.seed(int.from_bytes(os.urandom(8), "little") ^ shard_id)
+    sessions = {}
+    # Sessions migrated away by the latest reshard; never recreate them here.
+    # Cleared when the next reshard starts, since routing is consistent by then.
+    exported = set()
+
+    def get_bot(session_id, personality=None, temperature=None):
+        bot = sessions.get(session_id)
+        if bot is None:
+            if session_id in exported:
+                raise LookupError(f"Session {session_id!r} was migrated to another shard")
+            bot = ProfessionalChatbot(personality or (registry or default_registry).snapshot.default_personality,
+                                      temperature=0.7 if temperature is None else temperature,
+                                      registry=registry)
+            sessions[session_id] = bot
+            return bot
+
+        # Options sent with a message apply to existing sessions too
+        if personality is not None and personality != bot.personality:
+            result = bot.set_personality(personality)
+            if bot.personality != personality:
+                raise ValueError(result)
+        if temperature is not None:
+            bot.temperature = temperature
+        return bot
+
+    def handle(op, session_id, payload):
+        if op == "chat":
+            bot = get_bot(session_id, payload.get("personality"), payload.get("temperature"))
+            return bot.chat(payload["message"])
+        if op == "set_personality":
+            return get_bot(session_id).set_personality(payload["personality"])
+        if op == "clear":
+            return get_bot(session_id).clear_conversation()
+        if op == "summary":
+            return get_bot(session_id).get_conversation_summary()
+        if op == "export_session":
+            # Copy only; the source keeps the session until ``drop_session``
+            bot = sessions.get(session_id)
+            return None if bot is None else dump_snapshot(bot)
+        if op == "import_session":
+            sessions[session_id] = load_snapshot(payload, registry=registry)
+            exported.discard(session_id)
+            return True
+        if op == "drop_session":
+            dropped = sessions.pop(session_id, None) is not None
+            if payload.get("migrated"):
+                exported.add(session_id)
+            return dropped
+        if op == "begin_reshard":
+            exported.clear()
+            return list(sessions)
+        if op == "session_ids":
+            return list(sessions)
+        raise ValueError(f"Unknown operation: {op}")
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+
+        op = request[0]
+        if op == "stop":
+            conn.send(("ok", len(sessions)))
+            break
+
+        if op == "batch":
+            # One round trip for many requests amortises the IPC cost
+            results = []
+            for sub_op, session_id, payload in request[1]:
+                try:
+                    results.append(("ok", handle(sub_op, session_id, payload)))
+                except Exception as e:
+                    results.append(("error", f"{type(e).__name__}: {e}"))
+            conn.send(("ok", results))
+            continue
+
+        _, session_id, payload = request
+        try:
+            conn.send(("ok", handle(op, session_id, payload)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    conn.close()
+
+
+class _ShardHandle:
+    """Parent-side handle to one worker process"""
+
+    def __init__(self, ctx, shard_id, registry=None):
+        self.shard_id = shard_id
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(child_conn, shard_id, registry), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        # Set once a send/recv fails; the pipe may hold a stale reply after that
+        self.broken = None
+
+    def check(self):
+        if self.broken is not None:
+            raise RuntimeError(f"Shard {self.shard_id} is unavailable: {self.broken}")
+
+    def send(self, request):
+        """Send a request; caller must hold ``lock``"""
+        self.check()
+        try:
+            self.conn.send(request)
+        except (OSError, EOFError) as e:
+            self.broken = e
+            raise RuntimeError(f"Shard {self.shard_id} is unavailable: {e}") from e
+
+    def recv(self):
+        """Receive the reply to the last request; caller must hold ``lock``"""
+        try:
+            return self.conn.recv()
+        except (OSError, EOFError) as e:
+            self.broken = e
+            raise RuntimeError(f"Shard {self.shard_id} is unavailable: {e}") from e
+
+    def call(self, request):
+        with self.lock:
+            self.send(request)
+            status, result = self.recv()
+        if status == "error":
+            raise RuntimeError(f"Shard {self.shard_id}: {result}")
+        return result
+
+    def stop(self):
+        with self.lock:
+            if self.broken is None:
+                try:
+                    self.conn.send(("stop",))
+                    self.conn.recv()
+                except (EOFError, OSError):
+                    pass
+            self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class _ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers block new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+# STEP 3: ROUTER
+class ShardedChatRuntime:
+    """Router that owns a pool of chatbot worker processes with session affinity.
+
+    Sessions are created on ``registry`` (the bundled personalities by
+    default). Workers started with ``spawn``/``forkserver`` reload it from
+    its directory.
+    """
+
+    def __init__(self, num_workers=None, start_method=None, registry=None):
+        self.ctx = mp.get_context(start_method)
+        self.registry = registry
+        self.shards = []
+        # Requests hold the read side for their whole round trip; resharding
+        # takes the write side, so no request can reach a shard mid-migration
+        self._routing_lock = _ReadWriteLock()
+        self._spawn(num_workers or os.cpu_count() or 1)
+
+    def _spawn(self, count):
+        for _ in range(count):
+            self.shards.append(_ShardHandle(self.ctx, len(self.shards), self.registry))
+
+    @property
+    def num_workers(self):
+        return len(self.shards)
+
+    def _shard(self, session_id):
+        return self.shards[shard_for_session(session_id, len(self.shards))]
+
+    def _call(self, op, session_id, payload=None):
+        with self._routing_lock.read():
+            return self._shard(session_id).call((op, session_id, payload or {}))
+
+    def chat(self, session_id, message, personality=None, temperature=None):
+        """Send one message to a session; the session is created on first use.
+
+        ``personality`` and ``temperature`` also switch an existing session
+        when given; an unknown personality is reported as a ``RuntimeError``.
+        """
+        return self._call("chat", session_id, {
+            "message": message,
+            "personality": personality,
+            "temperature": temperature,
+        })
+
+    def chat_many(self, requests):
+        """Process ``(session_id, message[, personality[, temperature]])`` tuples in parallel.
+
+        Requests are grouped per shard and sent as one batch, so every worker
+        runs concurrently. Replies are returned in input order; failed
+        requests, including every request for an unavailable shard, are
+        returned as ``RuntimeError`` instances.
+        """
+        replies = [None] * len(requests)
+        with self._routing_lock.read():
+            groups = {}
+            for index, (session_id, message, *options) in enumerate(requests):
+                payload = {
+                    "message": message,
+                    "personality": options[0] if options else None,
+                    "temperature": options[1] if len(options) > 1 else None,
+                }
+                shard = self._shard(session_id)
+                groups.setdefault(shard.shard_id, []).append((index, ("chat", session_id, payload)))
+
+            # Send every batch before waiting on any reply
+            locked = []
+            try:
+                sent = []
+                for shard_id, items in groups.items():
+                    shard = self.shards[shard_id]
+                    shard.lock.acquire()
+                    locked.append(shard)
+                    try:
+                        shard.send(("batch", [request for _, request in items]))
+                        sent.append((shard, items))
+                    except RuntimeError as e:
+                        for index, _ in items:
+                            replies[index] = e
+
+                for shard, items in sent:
+                    try:
+                        _, results = shard.recv()
+                    except RuntimeError as e:
+                        results = [("error", str(e))] * len(items)
+                    for (index, _), (status, result) in zip(items, results):
+                        replies[index] = result if status == "ok" else RuntimeError(f"Shard {shard.shard_id}: {result}")
+            finally:
+                for shard in locked:
+                    shard.lock.release()
+        return replies
+
+    def set_personality(self, session_id, personality):
+        return self._call("set_personality", session_id, {"personality": personality})
+
+    def clear_conversation(self, session_id):
+        return self._call("clear", session_id)
+
+    def get_conversation_summary(self, session_id):
+        return self._call("summary", session_id)
+
+    def session_counts(self):
+        """Number of live sessions held by each worker"""
+        with self._routing_lock.read():
+            return [len(shard.call(("session_ids", None, {}))) for shard in self.shards]
+
+    def reshard(self, num_workers):
+        """Grow or shrink the worker pool, migrating only the sessions whose owner changes.
+
+        In-flight requests finish first and new ones wait while sessions move,
+        so no session is ever served by two workers at once. Sessions are
+        copied to their new owner before any source drops them; if any copy
+        fails the copies are discarded, the pool keeps its old size and the
+        error is raised.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+
+        with self._routing_lock.write():
+            old_count = len(self.shards)
+            if num_workers > old_count:
+                self._spawn(num_workers - old_count)
+
+            copied = []
+            try:
+                for shard in self.shards[:old_count]:
+                    for session_id in shard.call(("begin_reshard", None, {})):
+                        target = shard_for_session(session_id, num_workers)
+                        if target == shard.shard_id:
+                            continue
+                        state = shard.call(("export_session", session_id, {}))
+                        if state is not None:
+                            self.shards[target].call(("import_session", session_id, state))
+                            copied.append((session_id, shard, self.shards[target]))
+            except BaseException:
+                self._rollback_reshard(copied, old_count)
+                raise
+
+            # Every session now lives on its new owner; retire the old copies
+            for session_id, source, _ in copied:
+                try:
+                    source.call(("drop_session", session_id, {"migrated": True}))
+                except RuntimeError:
+                    # An unavailable source has lost its copy anyway
+                    pass
+
+            for shard in self.shards[num_workers:]:
+                shard.stop()
+            del self.shards[num_workers:]
+        return len(copied)
+
+    def _rollback_reshard(self, copied, old_count):
+        """Undo a partial reshard: discard the copies and stop any new workers"""
+        for session_id, _, target in copied:
+            if target.shard_id < old_count:
+                try:
+                    target.call(("drop_session", session_id, {}))
+                except RuntimeError:
+                    pass
+        for shard in self.shards[old_count:]:
+            shard.stop()
+        del self.shards[old_count:]
+
+    def shutdown(self):
+        """Stop every worker process"""
+        with self._routing_lock.write():
+            for shard in self.shards:
+                shard.stop()
+            self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+# MAIN EXECUTION
+if __name__ == "__main__":
+    import time
+
+    print("🚀 STARTING SHARDED CHATBOT RUNTIME")
+    print("=" * 60)
+
+    with ShardedChatRuntime() as runtime:
+        print(f"✅ Started {runtime.num_workers} worker processes")
+
+        requests = [(f"session-{i}", "My API keeps returning 500 errors. Can you help?")
+                    for i in range(2000)]
+        start = time.perf_counter()
+        replies = runtime.chat_many(requests)
+        elapsed = time.perf_counter() - start
+        print(f"📊 {len(replies)} replies in {elapsed:.2f}s "
+              f"({len(replies) / elapsed:.0f} msg/s)")
+        print(f"📦 Sessions per worker: {runtime.session_counts()}")
+
+        moved = runtime.reshard(runtime.num_workers + 1)
+        print(f"🔀 Resharded to {runtime.num_workers} workers, moved {moved} sessions")
+        print(f"📦 Sessions per worker: {runtime.session_counts()}")
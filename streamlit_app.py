@@ -1,10 +1,9 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 import plotly.express as px
 
 # Import our chatbot system
-from chatbot_system import ProfessionalChatbot
+from chatbot_system import ProfessionalChatbot, SmartMockGPT
 
 # Set page config
 st.set_page_config(
@@ -14,39 +13,83 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
+BOT_OPTIONS = {
+    "🤖 General Assistant": "helpful_assistant",
+    "🛠️ Tech Support": "technical_expert",
+    "✍️ Creative Writer": "creative_partner",
+    "💼 Business Consultant": "business_advisor",
+    "🎓 Learning Tutor": "learning_tutor"
+}
+
+# Messages shown per page; only one page is rendered on each rerun
+PAGE_SIZE = 10
+
+@st.cache_resource
+def get_backend():
+    """Response backend shared by every session and rerun"""
+    return SmartMockGPT()
+
+# Display label for each personality
+BOT_LABELS = {personality: label for label, personality in BOT_OPTIONS.items()}
+
+# Initialize session state. The bot's conversation_history is the only copy
+# of the chat history; the UI bot keeps all of it (the model still only sees
+# the most recent messages).
 if 'current_bot' not in st.session_state:
-    st.session_state.current_bot = ProfessionalChatbot("helpful_assistant")
+    st.session_state.current_bot = ProfessionalChatbot("helpful_assistant", backend=get_backend(),
+                                                       max_history=None)
 if 'bot_type' not in st.session_state:
     st.session_state.bot_type = "🤖 General Assistant"
 
+def get_history():
+    """Conversation history of the active bot"""
+    return st.session_state.current_bot.conversation_history
+
+def render_message(message):
+    """Render a single history entry, labelled with the personality that handled it"""
+    if message["role"] == "user":
+        with st.chat_message("user"):
+            st.write(f"👤 **You:** {message['content']}")
+    else:
+        label = BOT_LABELS.get(message.get("personality"), "🤖 Bot")
+        with st.chat_message("assistant"):
+            st.write(f"🤖 **{label}:** {message['content']}")
+
+def send_message(text):
+    """Send a message, then rerun so every history-dependent view is rebuilt"""
+    with st.spinner("🤖 Thinking..."):
+        try:
+            st.session_state.current_bot.chat(text)
+        except Exception as e:
+            st.session_state.last_error = f"❌ Error: {str(e)}"
+    # Jump back to the latest page
+    st.session_state.pop("history_page", None)
+    st.rerun()
+
 def create_analytics_dashboard():
     """Create analytics dashboard"""
     st.header("📊 Conversation Analytics")
     
-    if not st.session_state.messages:
+    history = get_history()
+    if not history:
         st.info("Start a conversation to see analytics!")
         return
     
     # Create metrics
-    total_messages = len(st.session_state.messages)
-    user_messages = len([m for m in st.session_state.messages if m["role"] == "user"])
-    bot_messages = len([m for m in st.session_state.messages if m["role"] == "assistant"])
+    summary = st.session_state.current_bot.get_conversation_summary()
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Messages", total_messages)
+        st.metric("Total Messages", summary["total_messages"])
     with col2:
-        st.metric("Your Messages", user_messages)
+        st.metric("Your Messages", summary["user_messages"])
     with col3:
-        st.metric("Bot Responses", bot_messages)
+        st.metric("Bot Responses", summary["ai_responses"])
     
     # Show message history
-    if st.session_state.messages:
+    if history:
         st.subheader("📝 Message History")
-        for i, msg in enumerate(st.session_state.messages[-10:]):  # Last 10 messages
+        for msg in history[-PAGE_SIZE:]:  # Last page only
             if msg["role"] == "user":
                 st.write(f"👤 **You:** {msg['content']}")
             else:
@@ -56,43 +99,37 @@ def main_chat_interface():
     """Main chat interface"""
     st.header("💬 Chat with AI")
     
-    # Bot selection
-    bot_options = {
-        "🤖 General Assistant": "helpful_assistant",
-        "🛠️ Tech Support": "technical_expert", 
-        "✍️ Creative Writer": "creative_partner",
-        "💼 Business Consultant": "business_advisor",
-        "🎓 Learning Tutor": "learning_tutor"
-    }
-    
     # Bot selector
     selected_bot = st.selectbox(
         "Choose your AI assistant:",
-        options=list(bot_options.keys()),
-        index=0
+        options=list(BOT_OPTIONS.keys()),
+        index=list(BOT_OPTIONS.keys()).index(st.session_state.bot_type)
     )
     
-    # Update bot if selection changed
+    # Update bot if selection changed; the conversation carries over
     if selected_bot != st.session_state.bot_type:
         st.session_state.bot_type = selected_bot
-        personality = bot_options[selected_bot]
-        st.session_state.current_bot = ProfessionalChatbot(personality)
+        st.session_state.current_bot.set_personality(BOT_OPTIONS[selected_bot])
         st.success(f"✅ Switched to {selected_bot}")
     
     # Display chat messages
     st.subheader("💬 Conversation")
     
+    # Only render one page of history so reruns don't grow with the conversation
+    history = get_history()
+    page_count = max(1, -(-len(history) // PAGE_SIZE))
+    page = page_count
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=page_count,
+                               key="history_page", help="Latest messages are on the last page")
+    
     # Create a container for messages
     message_container = st.container()
     
     with message_container:
-        for message in st.session_state.messages:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(f"👤 **You:** {message['content']}")
-            else:
-                with st.chat_message("assistant"):
-                    st.write(f"🤖 **{selected_bot}:** {message['content']}")
+        end = len(history) - (page_count - page) * PAGE_SIZE
+        for message in history[max(0, end - PAGE_SIZE):end]:
+            render_message(message)
     
     # Chat input
     st.subheader("✍️ Send Message")
@@ -113,73 +150,40 @@ def main_chat_interface():
         send_button = st.button("📤 Send", type="primary", use_container_width=True)
         clear_button = st.button("🧹 Clear", use_container_width=True)
     
+    if 'last_error' in st.session_state:
+        st.error(st.session_state.pop('last_error'))
+    
     # Handle send button
     if send_button and user_input.strip():
-        # Add user message
-        st.session_state.messages.append({
-            "role": "user", 
-            "content": user_input,
-            "timestamp": datetime.now()
-        })
-        
-        # Get bot response
-        with st.spinner("🤖 Thinking..."):
-            try:
-                response = st.session_state.current_bot.chat(user_input)
-                
-                # Add bot response
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": response,
-                    "timestamp": datetime.now()
-                })
-                
-                st.success("✅ Message sent!")
-                
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-        
-        # Clear the input and rerun to show new messages
-        st.rerun()
+        send_message(user_input)
     
     # Handle clear button
     if clear_button:
-        st.session_state.messages = []
         st.session_state.current_bot.clear_conversation()
+        st.session_state.pop("history_page", None)
         st.success("🧹 Conversation cleared!")
         st.rerun()
     
-    # Quick starter buttons
-    if not st.session_state.messages:
+    # Quick starters
+    if not get_history():
         st.subheader("🚀 Quick Starters")
         col1, col2, col3 = st.columns(3)
         
+        starter = None
         with col1:
             if st.button("👋 Say Hello"):
-                st.session_state.messages.append({
-                    "role": "user", 
-                    "content": "Hello! What can you help me with?",
-                    "timestamp": datetime.now()
-                })
-                st.rerun()
+                starter = "Hello! What can you help me with?"
         
         with col2:
             if st.button("❓ Ask for Help"):
-                st.session_state.messages.append({
-                    "role": "user", 
-                    "content": "I need help with a project. Can you assist me?",
-                    "timestamp": datetime.now()
-                })
-                st.rerun()
+                starter = "I need help with a project. Can you assist me?"
         
         with col3:
             if st.button("💡 Get Ideas"):
-                st.session_state.messages.append({
-                    "role": "user", 
-                    "content": "Can you give me some creative ideas?",
-                    "timestamp": datetime.now()
-                })
-                st.rerun()
+                starter = "Can you give me some creative ideas?"
+        
+        if starter:
+            send_message(starter)
 
 def bot_comparison():
     """Compare responses from different bots"""
@@ -190,20 +194,15 @@ def bot_comparison():
                                  placeholder="e.g., How do I improve my productivity?")
     
     if st.button("🧪 Test All Bots") and test_question:
-        personalities = {
-            "🤖 General Assistant": "helpful_assistant",
-            "🛠️ Tech Support": "technical_expert", 
-            "✍️ Creative Writer": "creative_partner",
-            "💼 Business Consultant": "business_advisor",
-            "🎓 Learning Tutor": "learning_tutor"
-        }
-        
         st.subheader("🎭 Comparison Results")
         
-        for bot_name, personality in personalities.items():
+        # One scratch bot is reused for every personality
+        test_bot = ProfessionalChatbot(backend=get_backend())
+        for bot_name, personality in BOT_OPTIONS.items():
             with st.expander(f"{bot_name} Response", expanded=True):
                 with st.spinner(f"Getting response from {bot_name}..."):
-                    test_bot = ProfessionalChatbot(personality)
+                    test_bot.clear_conversation()
+                    test_bot.set_personality(personality)
                     response = test_bot.chat(test_question)
                     st.write(response)
                     st.caption(f"Length: {len(response)} characters")
@@ -235,10 +234,10 @@ with st.sidebar.expander("ℹ️ About This App"):
     """)
 
 # Show quick stats
-if st.session_state.messages:
+if get_history():
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📈 Quick Stats")
-    st.sidebar.metric("Total Messages", len(st.session_state.messages))
+    st.sidebar.metric("Total Messages", len(get_history()))
 
 # Main content
 st.title("🤖 Professional AI Chatbot Hub")